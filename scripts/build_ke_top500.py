@@ -21,206 +21,423 @@ We then write public/top500_ranked.csv and this will be converted to channels.cs
 """
 
 from __future__ import annotations
-import argparse, csv, os, re, sys, time, math
-from dataclasses import dataclass, asdict
+import argparse, csv, hashlib, heapq, json, os, re, sys, time, random, threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
-from typing import Dict, List, Optional, Set, Iterable
+from typing import Dict, List, Optional, Set, Iterable, Tuple
+from urllib.parse import urlsplit, parse_qsl
 
 try:
     from googleapiclient.discovery import build
+    from googleapiclient.errors import HttpError
+    from googleapiclient.http import build_http
+    from googleapiclient.model import JsonModel
 except Exception:
     print("[KE500] ERROR: google-api-python-client not installed. pip install google-api-python-client", file=sys.stderr)
     sys.exit(2)
 
+import numpy as np
+
+try:
+    import orjson   # optional: 2-3x faster parsing of the 50-item API responses
+except ImportError:
+    orjson = None
+
 # ----------------- Config -----------------
 SEED_IDS_PATH = "seed_channel_ids.txt"
 BLOCKED_IDS_PATH = "blocked_channel_ids.txt"
 
-DISCOVERY_QUERIES = [
+DISCOVERY_QUERIES = (
     # broad → narrow
     "podcast kenya", "kenyan podcast", "nairobi podcast", "kenya talk show",
     "kenyan interviews", "interview kenya", "talk show kenya",
     "Lynn Ngugi interview", "JKLive", "The Trend NTV",
     "Cleaning The Airwaves", "Presenter Ali interview",
     "MIC CHEQUE podcast", "Sandwich Podcast KE", "ManTalk Ke podcast",
-]
+)
 
 YOUTUBE_SEARCH_PAGE_SIZE = 50
 MAX_DISCOVER_CHANNELS_PER_QUERY = 100   # cap per query
 MAX_DISCOVER_QUERIES = 20               # hard cap in case someone extends list
+MIN_NEW_IDS_PER_PAGE = 5                # stop paging a query once a page adds fewer unseen channels
+
+# Per-channel feature extraction is pure network wait; fan it out over threads
+MAX_WORKERS = 16
+
+# API pacing / resilience (shared by all worker threads)
+API_MAX_RPS       = 50      # token-bucket refill ceiling (requests/sec); the only throttle
+API_BURST         = 20
+API_MIN_RPS       = 1.0     # floor when throttled; halved on every 429 / rate-limit 403
+API_RPS_STEP      = 0.5     # added back per successful call until API_MAX_RPS
+API_MAX_RETRIES   = 5
+API_MAX_BACKOFF   = 30.0    # seconds
+TRANSIENT_STATUS  = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded"}
+TRANSIENT_REASONS = RATE_LIMIT_REASONS | {"backendError"}
+
+# On-disk response cache so reruns (e.g. the workflow's seed-only fallback) skip the network
+CACHE_DIR = ".ytcache"
+CACHE_TTL_HOURS = {"search": 24, "channels": 24, "playlistItems": 1}
+CACHE_MAX_AGE_DAYS = 7   # entries untouched this long are deleted, ETag or not
+# Per-channel features from earlier runs; channels younger than --refresh_ttl_hours skip all API work
+FEATURES_STORE_PATH = os.path.join(CACHE_DIR, "features.json")
 
 # Minimum channel bar to avoid noise
 MIN_SUBSCRIBERS     = 2_000
 MIN_CHANNEL_VIEWS   = 500_000
 
-# Video gate for long-form + content type
-MIN_LONGFORM_SEC    = 11 * 60
-MAX_VIDEO_AGE_DAYS  = 365
-MIN_VIDEO_VIEWS     = 5_000   # just to avoid tiny uploads in the "latest" check
-
-# Filters (match your Node filtering)
-SHORTS_RE = re.compile(r'(^|\W)(shorts?|#shorts)(\W|$)', re.I)
-SPORTS_RE = re.compile(r'\b(highlights?|extended\s*highlights|FT|full\s*time|full\s*match|goal|matchday)\b|\b(\d+\s*-\s*\d+)\b', re.I)
-CLUBS_RE  = re.compile(r'\b(sportscast|manchester united|arsenal|liverpool|chelsea)\b', re.I)
-SENS_RE   = re.compile(r'(catch(ing)?|expos(e|ing)|confront(ing)?|loyalty\s*test|loyalty\s*challenge|pop\s*the\s*balloon)', re.I)
-MIX_RE    = re.compile(r'\b(dj\s*mix|dj\s*set|mixtape|party\s*mix|afrobeat\s*mix|bongo\s*mix|live\s*mix)\b', re.I)
-TAG_BLOCKS = {"#sportshighlights","#sports","#highlights","#shorts","#short","sportshighlights","sports","highlights","shorts","short"}
+# Score weights: subs, views, videos, upload frequency, recency
+SCORE_WEIGHTS = np.array([0.25, 0.25, 0.10, 0.20, 0.20])
 
 KENYA_HINTS_RE       = re.compile(r'\b(kenya|kenyan|nairob[iy]|mombasa|kisumu|ke\b)\b', re.I)
 PODCAST_INTERVIEW_RE = re.compile(r'\b(podcast|interview|talk\s*show|conversation|panel)\b', re.I)
 
+# Server-side projections: only the fields this script reads (keep nextPageToken on paged calls,
+# etag so stale cache entries can be revalidated)
+SEARCH_FIELDS   = "etag,nextPageToken,items/snippet/channelId"
+CHANNEL_FIELDS  = "etag,items(id,snippet(title,description,country),statistics(subscriberCount,viewCount,videoCount))"
+PLAYLIST_FIELDS = "etag,nextPageToken,items/contentDetails/videoPublishedAt"
+
 # ------------- Helpers -------------
-def now_utc_iso(): return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+ISO_Z_FMT = "%Y-%m-%dT%H:%M:%SZ"   # the API's publishedAt format
 
-def iso8601_duration_to_seconds(s: Optional[str]) -> Optional[int]:
-    if not s: return None
-    m = re.match(r"^PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?$", s)
-    if not m: return None
-    h = int(m.group(1) or 0); m_ = int(m.group(2) or 0); sec = int(m.group(3) or 0)
-    return h*3600 + m_*60 + sec
+def now_utc_iso(): return datetime.now(timezone.utc).strftime(ISO_Z_FMT)
 
 def load_lines(path: str) -> List[str]:
     if not os.path.exists(path): return []
     with open(path, "r", encoding="utf-8") as f:
-        return [ln.strip() for ln in f if ln.strip() and not ln.startswith("#")]
+        lines = f.read().splitlines()
+    return [s for ln in lines if (s := ln.strip()) and not s.startswith("#")]
 
 def chunked(seq, n):
     for i in range(0, len(seq), n):
         yield seq[i:i+n]
 
-def safe_get(d, path, default=None):
-    cur = d
-    for key in path:
-        if not isinstance(cur, dict): return default
-        cur = cur.get(key)
-        if cur is None: return default
-    return cur
-
 def to_int(x) -> int:
     try: return int(x or "0")
     except: return 0
 
-def log10p1(x: int) -> float:
-    return math.log10(max(1, x))
-
-def minmax_norm(values: List[float]) -> Dict[int, float]:
-    if not values: return {}
-    mn, mx = min(values), max(values)
-    if mx <= mn: return {i: 0.0 for i in range(len(values))}
-    return {i: (values[i] - mn) / (mx - mn) for i in range(len(values))}
+def parse_utc(iso_str: str) -> datetime:
+    # fromisoformat() only learned the trailing "Z" in 3.11
+    if iso_str.endswith("Z"):
+        iso_str = iso_str[:-1] + "+00:00"
+    return datetime.fromisoformat(iso_str)
 
-def days_since(iso_str: str) -> float:
-    try:
-        t = datetime.fromisoformat(iso_str.replace("Z", "+00:00"))
-    except Exception:
-        return 9999.0
-    return (datetime.now(timezone.utc) - t).total_seconds() / 86400.0
-
-def looks_blocked_text(title: str, desc: str, tags: List[str]) -> bool:
-    txt = (title or "") + "\n" + (desc or "")
-    if SHORTS_RE.search(txt) or SPORTS_RE.search(txt) or CLUBS_RE.search(txt): return True
-    if SENS_RE.search(txt) or MIX_RE.search(txt): return True
-    if tags and any((t or "").lower().strip() in TAG_BLOCKS for t in tags): return True
-    return False
-
-def is_kenyan(snippet: dict, branding: dict, cid: str, allow_ids: Set[str]) -> bool:
-    country = (safe_get(branding, ["channel", "country"], "") or "").upper()
+def is_kenyan(snippet: dict, cid: str, allow_ids: Set[str]) -> bool:
+    country = (snippet.get("country", "") or "").upper()
     if country == "KE": return True
     txt = (snippet.get("title","") or "") + " " + (snippet.get("description","") or "")
     if KENYA_HINTS_RE.search(txt): return True
     return cid in allow_ids
 
 # ------------- YouTube client -------------
+_tls = threading.local()
+_service = None
+_service_lock = threading.Lock()
+
+class OrjsonModel(JsonModel):
+    """JsonModel that parses response bodies with orjson."""
+    def deserialize(self, content):
+        try:
+            return orjson.loads(content)
+        except orjson.JSONDecodeError:
+            return super().deserialize(content)
+
 def yt_client():
-    k = os.environ.get("YT_API_KEY")
-    if not k:
-        sys.exit("[KE500] ERROR: YT_API_KEY env var missing")
-    return build("youtube", "v3", developerKey=k, cache_discovery=False)
-
-def search_channels(y, query: str, limit: int) -> List[str]:
-    """Return a list of channel IDs for a query."""
-    ids = []
-    tok = None
-    while len(ids) < limit:
-        res = y.search().list(
-            q=query, part="snippet", type="channel",
-            maxResults=min(50, limit - len(ids)),
-            pageToken=tok, regionCode="KE"
-        ).execute()
-        for it in res.get("items", []):
-            cid = safe_get(it, ["snippet", "channelId"])
-            if cid: ids.append(cid)
-        tok = res.get("nextPageToken")
-        if not tok: break
-        time.sleep(0.1)
-    return ids
+    """Return the shared service, built once from the bundled (static) discovery document."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            k = os.environ.get("YT_API_KEY")
+            if not k:
+                sys.exit("[KE500] ERROR: YT_API_KEY env var missing")
+            _service = build("youtube", "v3", developerKey=k, cache_discovery=False,
+                             static_discovery=True, model=OrjsonModel() if orjson else None)
+    return _service
+
+def _thread_http():
+    """This thread's keep-alive transport; httplib2 connections must not be shared across threads."""
+    h = getattr(_tls, "http", None)
+    if h is None:
+        h = _tls.http = build_http()
+    return h
+
+class RateLimiter:
+    """Thread-safe token bucket: `rate` requests/sec with bursts up to `burst`."""
+    def __init__(self, rate: float, burst: int = 1):
+        self.max_rate = self.rate = float(rate)
+        self.capacity = float(max(1, burst))
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def slow_down(self):
+        """Server said we're too fast: halve the rate (never below API_MIN_RPS)."""
+        with self.lock:
+            self.rate = max(API_MIN_RPS, self.rate / 2)
+
+    def speed_up(self):
+        """A request went through: creep back towards the configured rate."""
+        if self.rate < self.max_rate:
+            with self.lock:
+                self.rate = min(self.max_rate, self.rate + API_RPS_STEP)
+
+_limiter = RateLimiter(API_MAX_RPS, API_BURST)
+
+def _http_reason(e: "HttpError") -> str:
+    try:
+        body = e.content.decode("utf-8") if isinstance(e.content, bytes) else (e.content or "")
+        return json.loads(body)["error"]["errors"][0].get("reason", "")
+    except Exception:
+        return ""
+
+class ResponseCache:
+    """JSON responses on disk, keyed by sha1(endpoint + sorted params) with a per-endpoint TTL.
+
+    Batched lookups whose batch composition varies between runs (channels.list) are
+    stored per resource instead, as <endpoint>.<id>.json. Expired entries are kept
+    for ETag revalidation with If-None-Match until prune() deletes them.
+    """
+    # only files this class writes; prune() must never touch the feature store
+    FILE_RE = re.compile(r'^(?:[0-9a-f]{40}|[A-Za-z]+\.[\w-]+)\.json(?:\.\d+\.tmp)?$')
+
+    def __init__(self, root: str, ttl_hours: Dict[str, float], max_age_hours: Optional[float] = None):
+        self.root = root
+        self.ttl_hours = ttl_hours
+        self.max_age_hours = max_age_hours   # overrides the per-endpoint TTLs when set
+        os.makedirs(root, exist_ok=True)
+
+    @staticmethod
+    def _key(uri: str):
+        u = urlsplit(uri)
+        endpoint = u.path.rstrip("/").rsplit("/", 1)[-1]
+        params = sorted((k, v) for k, v in parse_qsl(u.query) if k not in ("key", "alt"))
+        return endpoint, hashlib.sha1(repr((endpoint, params)).encode("utf-8")).hexdigest()
+
+    def _fresh(self, endpoint: str, path: str) -> Optional[dict]:
+        ttl = self.max_age_hours if self.max_age_hours is not None else self.ttl_hours.get(endpoint, 0)
+        try:
+            if time.time() - os.path.getmtime(path) > ttl * 3600:
+                return None
+        except OSError:
+            return None
+        return self._read(path)
 
-def list_channels(y, cids: List[str]) -> List[dict]:
-    out = []
-    for b in chunked(cids, 50):
-        res = y.channels().list(
-            part="snippet,statistics,contentDetails,brandingSettings",
-            id=",".join(b)
-        ).execute()
-        out += res.get("items", [])
-        time.sleep(0.1)
-    return out
+    def get(self, uri: str) -> Optional[dict]:
+        endpoint, key = self._key(uri)
+        return self._fresh(endpoint, os.path.join(self.root, key + ".json"))
+
+    def get_item(self, endpoint: str, rid: str) -> Optional[dict]:
+        return self._fresh(endpoint, os.path.join(self.root, f"{endpoint}.{rid}.json"))
+
+    def stale(self, uri: str) -> Optional[dict]:
+        """The stored body regardless of age (for ETag revalidation)."""
+        _, key = self._key(uri)
+        return self._read(os.path.join(self.root, key + ".json"))
+
+    def touch(self, uri: str):
+        """Restart an entry's TTL after the server confirmed it unchanged (304)."""
+        _, key = self._key(uri)
+        try: os.utime(os.path.join(self.root, key + ".json"))
+        except OSError: pass
+
+    @staticmethod
+    def _read(path: str) -> Optional[dict]:
+        try:
+            with open(path, "rb") as f:
+                return orjson.loads(f.read()) if orjson else json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write(path: str, body: dict):
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(body, f)
+        os.replace(tmp, path)
+
+    def put(self, uri: str, body: dict):
+        _, key = self._key(uri)
+        self._write(os.path.join(self.root, key + ".json"), body)
+
+    def put_item(self, endpoint: str, rid: str, item: dict):
+        self._write(os.path.join(self.root, f"{endpoint}.{rid}.json"), item)
+
+    def prune(self, max_age_hours: float) -> int:
+        """Delete cache files older than max_age_hours; returns how many were removed."""
+        cutoff = time.time() - max_age_hours * 3600
+        removed = 0
+        for e in os.scandir(self.root):
+            if not self.FILE_RE.match(e.name):
+                continue
+            try:
+                if e.stat().st_mtime < cutoff:
+                    os.remove(e.path)
+                    removed += 1
+            except OSError:
+                pass
+        return removed
+
+_cache: Optional[ResponseCache] = None
+
+def _cached_items(endpoint: str, ids: Iterable[str]) -> Tuple[Dict[str, dict], List[str]]:
+    """Split resource IDs into ({id: fresh cached item}, [IDs that need fetching])."""
+    hits: Dict[str, dict] = {}
+    missing: List[str] = []
+    for rid in ids:
+        item = _cache.get_item(endpoint, rid) if _cache is not None else None
+        if item is not None:
+            hits[rid] = item
+        else:
+            missing.append(rid)
+    return hits, missing
+
+def _exec(req):
+    """Execute a googleapiclient request, served from the response cache when fresh.
+
+    A stale cached body is revalidated with If-None-Match; on 304 it is reused as-is.
+    """
+    old = None
+    if _cache is not None:
+        hit = _cache.get(req.uri)
+        if hit is not None:
+            return hit
+        old = _cache.stale(req.uri)
+        if old and old.get("etag"):
+            req.headers["If-None-Match"] = old["etag"]
+    try:
+        res = _exec_remote(req)
+    except HttpError as e:
+        if old is None or getattr(e.resp, "status", 0) != 304:
+            raise
+        _cache.touch(req.uri)
+        return old
+    if _cache is not None:
+        _cache.put(req.uri, res)
+    return res
+
+def _exec_remote(req):
+    """Execute a googleapiclient request behind the shared rate limiter.
+
+    429/5xx and per-second rate-limit 403s are retried with exponential
+    backoff (honouring Retry-After); anything else — notably a 403
+    quotaExceeded — is raised immediately so the run can bail out.
+    """
+    for attempt in range(API_MAX_RETRIES + 1):
+        _limiter.acquire()
+        try:
+            res = req.execute(http=_thread_http())
+            _limiter.speed_up()
+            return res
+        except HttpError as e:
+            status = getattr(e.resp, "status", 0)
+            reason = _http_reason(e) if status == 403 else ""
+            if status == 429 or reason in RATE_LIMIT_REASONS:
+                _limiter.slow_down()
+            transient = status in TRANSIENT_STATUS or reason in TRANSIENT_REASONS
+            if not transient or attempt == API_MAX_RETRIES:
+                raise
+            retry_after = to_int(e.resp.get("retry-after")) if hasattr(e.resp, "get") else 0
+            delay = retry_after or min(API_MAX_BACKOFF, 2 ** attempt + random.random())
+            print(f"[KE500] HTTP {status}; retry {attempt + 1}/{API_MAX_RETRIES} in {delay:.1f}s", file=sys.stderr)
+            time.sleep(delay)
+
+def search_page(y, query: str, page_token: Optional[str], n: int) -> Tuple[List[str], Optional[str]]:
+    """One search.list page: (channel IDs, next page token or None)."""
+    res = _exec(y.search().list(
+        q=query, part="snippet", type="channel",
+        maxResults=min(YOUTUBE_SEARCH_PAGE_SIZE, n),
+        pageToken=page_token, regionCode="KE", fields=SEARCH_FIELDS
+    ))
+    ids = [cid for it in res.get("items", []) if (cid := (it.get("snippet") or {}).get("channelId"))]
+    return ids, res.get("nextPageToken")
+
+def discover_channels(ex: ThreadPoolExecutor, queries: Iterable[str], limit: int, candidates: Dict[str, None]):
+    """Page all queries concurrently, one page per query per round, adding hits to `candidates` in order.
+
+    A query stops paging as soon as a page adds fewer than MIN_NEW_IDS_PER_PAGE channels
+    not already seen (seeds or earlier hits, counted in query order within each round),
+    so overlapping queries don't burn search quota re-finding the same IDs. Hits are
+    merged once paging ends, each query's pages together in query order.
+    """
+    state = {q: (None, 0) for q in queries}   # query -> (page token, IDs fetched)
+    found: Dict[str, List[str]] = {q: [] for q in state}
+    seen = set(candidates)
+    active = list(state)
+    while active:
+        def fetch(q):
+            tok, got = state[q]
+            return search_page(yt_client(), q, tok, limit - got)
+        pages = list(ex.map(fetch, active))
+        still = []
+        for q, (ids, tok) in zip(active, pages):
+            found[q] += ids
+            new = 0
+            for cid in ids:
+                if cid not in seen:
+                    seen.add(cid)
+                    new += 1
+            got = state[q][1] + len(ids)
+            state[q] = (tok, got)
+            if tok and got < limit and new >= MIN_NEW_IDS_PER_PAGE:
+                still.append(q)
+        active = still
+    for ids in found.values():
+        for cid in ids:
+            candidates.setdefault(cid)
 
-def list_upload_ids(y, uploads_playlist_id: str, max_items: int) -> List[str]:
+def list_channels(y, cids: List[str]) -> List[dict]:
+    # cached per channel: batch composition changes run to run, so whole-URI keys never hit
+    got, missing = _cached_items("channels", cids)
+    for b in chunked(missing, 50):
+        res = _exec_remote(y.channels().list(
+            part="snippet,statistics",
+            id=",".join(b), fields=CHANNEL_FIELDS
+        ))
+        for ch in res.get("items", []):
+            cid = ch.get("id")
+            if not cid: continue
+            got[cid] = ch
+            if _cache is not None:
+                _cache.put_item("channels", cid, ch)
+    return [got[cid] for cid in dict.fromkeys(cids) if cid in got]
+
+def list_upload_dates(y, uploads_playlist_id: str, max_items: int) -> List[str]:
     out, tok = [], None
     while len(out) < max_items:
-        res = y.playlistItems().list(
-            part="contentDetails", playlistId=uploads_playlist_id,
-            maxResults=min(50, max_items - len(out)), pageToken=tok
-        ).execute()
+        try:
+            res = _exec(y.playlistItems().list(
+                part="contentDetails", playlistId=uploads_playlist_id,
+                maxResults=min(50, max_items - len(out)), pageToken=tok,
+                fields=PLAYLIST_FIELDS
+            ))
+        except HttpError as e:
+            # a derived uploads ID can 404 (channel never uploaded / playlist hidden)
+            if getattr(e.resp, "status", 0) == 404: break
+            raise
         for it in res.get("items", []):
-            vid = safe_get(it, ["contentDetails", "videoId"])
-            if vid: out.append(vid)
+            # private/deleted entries carry no videoPublishedAt; "" keeps the channel
+            # counted as having uploads, it just never wins the recency max
+            out.append((it.get("contentDetails") or {}).get("videoPublishedAt") or "")
         tok = res.get("nextPageToken")
         if not tok: break
-        time.sleep(0.1)
-    return out
-
-def list_videos(y, ids: List[str]) -> List[dict]:
-    out = []
-    for b in chunked(ids, 50):
-        res = y.videos().list(
-            part="snippet,contentDetails,statistics",
-            id=",".join(b)
-        ).execute()
-        out += res.get("items", [])
-        time.sleep(0.1)
     return out
 
 # ------------- Build features -------------
-def latest_acceptable(y, uploads_playlist_id: str) -> Optional[dict]:
-    """Return the newest acceptable long-form video dict (id, title, thumb, publishedAt, duration, views)."""
-    ids = list_upload_ids(y, uploads_playlist_id, 15)
-    if not ids: return None
-    vids = list_videos(y, ids)
-    # newest first
-    vids.sort(key=lambda v: safe_get(v, ["snippet", "publishedAt"], ""), reverse=True)
-
-    for v in vids:
-        dur = iso8601_duration_to_seconds(safe_get(v, ["contentDetails", "duration"]))
-        title = safe_get(v, ["snippet", "title"], "") or ""
-        desc  = safe_get(v, ["snippet", "description"], "") or ""
-        tags  = safe_get(v, ["snippet", "tags"], []) or []
-        pub   = safe_get(v, ["snippet", "publishedAt"], "") or ""
-        views = to_int(safe_get(v, ["statistics", "viewCount"]))
-        if dur and dur < MIN_LONGFORM_SEC:      continue
-        if looks_blocked_text(title, desc, tags): continue
-        if days_since(pub) > MAX_VIDEO_AGE_DAYS:  continue
-        if views < MIN_VIDEO_VIEWS:               continue
-        thumb = (safe_get(v, ["snippet", "thumbnails", "high", "url"], "")
-              or safe_get(v, ["snippet", "thumbnails", "medium", "url"], ""))
-        return {
-            "id": v.get("id",""), "title": title, "thumb": thumb,
-            "publishedAt": pub, "duration_sec": dur, "views": views
-        }
-    return None
-
-@dataclass
+@dataclass(slots=True)
 class ChannelFeatures:
     cid: str
     name: str
@@ -231,150 +448,245 @@ class ChannelFeatures:
     uploads_90d: int
     days_since_last: float
 
-def extract_features(y, ch: dict) -> Optional[ChannelFeatures]:
+def uploads_playlist_id(ch: dict) -> Optional[str]:
+    """A channel's uploads playlist is its ID with the UC prefix swapped for UU.
+
+    channels.list doesn't request contentDetails, so there is no API value to fall
+    back on: a non-UC ID yields None, and a derived ID that 404s reads as no uploads.
+    """
+    cid = ch.get("id") or ""
+    if cid.startswith("UC"):
+        return "UU" + cid[2:]
+    return None
+
+def eligible_uploads_playlist(ch: dict, allow_ids: Set[str]) -> Optional[str]:
+    """Kenya + channel-threshold gate. Returns the uploads playlist ID if the channel qualifies.
+
+    Channels in `allow_ids` (the seeds) skip the Kenya check but not the thresholds.
+    """
     cid = ch.get("id") or ""
     sn  = ch.get("snippet", {}) or {}
     stats = ch.get("statistics", {}) or {}
-    branding = ch.get("brandingSettings", {}) or {}
-    content  = ch.get("contentDetails", {}) or {}
 
     # Kenya inclusion
-    if not is_kenyan(sn, branding, cid, allow_ids=set()):  # allow_ids handled later globally
-        # we'll allow via seeds later; for discovery we keep Kenya-only
-        country = (safe_get(branding, ["channel", "country"], "") or "").upper()
-        txt = (sn.get("title","") or "") + " " + (sn.get("description","") or "")
-        if country != "KE" and not KENYA_HINTS_RE.search(txt):
-            return None
+    if not is_kenyan(sn, cid, allow_ids):
+        return None
 
     subs  = to_int(stats.get("subscriberCount"))
     views = to_int(stats.get("viewCount"))
-    vids  = to_int(stats.get("videoCount"))
     if subs < MIN_SUBSCRIBERS or views < MIN_CHANNEL_VIEWS:
         return None
 
-    uploads = safe_get(content, ["relatedPlaylists", "uploads"])
-    if not uploads: return None
+    return uploads_playlist_id(ch)
 
-    # Pull recent ~30 upload ids to compute 90d uploads + recency
-    ids = list_upload_ids(y, uploads, 30)
-    if not ids:
-        return None
-    vmeta = list_videos(y, ids)
+def extract_features(ch: dict, published: List[str], now: datetime) -> ChannelFeatures:
+    """Compute ranking features from a channel resource and its recent uploads' publish times."""
+    cid = ch.get("id") or ""
+    sn  = ch.get("snippet", {}) or {}
+    stats = ch.get("statistics", {}) or {}
 
-    # uploads in last 90 days + last upload age
-    ninety_days_ago = datetime.now(timezone.utc) - timedelta(days=90)
+    # uploads in last 90 days + last upload age; ISO strings compare in time order,
+    # so only the newest one is ever parsed
+    cutoff_90d = (now - timedelta(days=90)).strftime(ISO_Z_FMT)
     uploads_90d = 0
-    latest_pub = None
-    for v in vmeta:
-        pub = safe_get(v, ["snippet", "publishedAt"], "")
-        try:
-            ts = datetime.fromisoformat(pub.replace("Z", "+00:00"))
-        except Exception:
-            continue
-        if ts >= ninety_days_ago:
+    latest_pub = ""
+    for pub in published:
+        if pub >= cutoff_90d:
             uploads_90d += 1
-        if (latest_pub is None) or (ts > latest_pub):
-            latest_pub = ts
+        if pub > latest_pub:
+            latest_pub = pub
 
-    days_last = (datetime.now(timezone.utc) - latest_pub).total_seconds() / 86400.0 if latest_pub else 9999.0
+    try:
+        days_last = (now - parse_utc(latest_pub)).total_seconds() / 86400.0
+    except ValueError:
+        days_last = 9999.0
 
     return ChannelFeatures(
         cid=cid,
         name=sn.get("title","") or "",
         url=f"https://www.youtube.com/channel/{cid}",
-        subscribers=subs,
-        video_count=vids,
-        views_total=views,
+        subscribers=to_int(stats.get("subscriberCount")),
+        video_count=to_int(stats.get("videoCount")),
+        views_total=to_int(stats.get("viewCount")),
         uploads_90d=uploads_90d,
         days_since_last=days_last
     )
 
+def fetch_channel_pipeline(ex: ThreadPoolExecutor, cids: List[str], max_uploads: int,
+                           allow_ids: Set[str]) -> Tuple[Dict[str, dict], Dict[str, List[str]]]:
+    """channels.list → playlistItems as overlapping stages on one pool.
+
+    Each finished channel batch immediately submits the uploads lookups for its
+    eligible channels, so those are in flight while later channel batches are
+    still loading. Returns ({cid: channel resource}, {cid: newest upload publish times}).
+    """
+    ch_objs: Dict[str, dict] = {}
+    uploads: Dict[str, List[str]] = {}
+    futs = {}
+
+    def submit(stage, key, fn, arg):
+        futs[ex.submit(fn, arg)] = (stage, key)
+
+    def get_channels(b): return list_channels(yt_client(), b)
+    def get_uploads(pid): return list_upload_dates(yt_client(), pid, max_uploads)
+
+    def add_channels(res):
+        for ch in res:
+            cid = ch.get("id") or ""
+            if not cid or cid in ch_objs:
+                continue
+            ch_objs[cid] = ch
+            pid = eligible_uploads_playlist(ch, allow_ids)
+            if pid:
+                uploads[cid] = []
+                submit("uploads", cid, get_uploads, pid)
+
+    # cached channels go straight to the uploads stage; only the rest fill 50-ID batches
+    hits, missing = _cached_items("channels", cids)
+    add_channels(hits.values())
+    for b in chunked(missing, 50):
+        submit("channels", None, get_channels, b)
+    while futs:
+        done, _ = wait(futs, return_when=FIRST_COMPLETED)
+        for f in done:
+            stage, key = futs.pop(f)
+            res = f.result()
+            if stage == "channels":
+                add_channels(res)
+            else:
+                uploads[key] = res
+    return ch_objs, uploads
+
+def load_feature_store(path: str) -> Dict[str, dict]:
+    """Raw {cid: {"fetched_at": epoch, "features": {...}}} records from a previous run."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def fresh_features(store: Dict[str, dict], ttl_hours: float) -> Dict[str, ChannelFeatures]:
+    """Stored features younger than `ttl_hours`, with recency aged forward to now."""
+    out: Dict[str, ChannelFeatures] = {}
+    if ttl_hours <= 0: return out
+    now = time.time()
+    for cid, rec in store.items():
+        # a malformed record only costs that channel a refetch, never the run
+        try:
+            age = now - float(rec["fetched_at"])
+            if age > ttl_hours * 3600: continue
+            feat = ChannelFeatures(**rec["features"])
+            for k in ("subscribers", "video_count", "views_total", "uploads_90d"):
+                setattr(feat, k, int(getattr(feat, k)))
+            feat.days_since_last = float(feat.days_since_last)
+        except (AttributeError, KeyError, TypeError, ValueError):
+            continue
+        if feat.days_since_last < 9999.0:
+            feat.days_since_last += age / 86400.0
+        out[cid] = feat
+    return out
+
+def save_feature_store(path: str, store: Dict[str, dict]):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(store, f)
+    os.replace(tmp, path)
+
 def compute_scores(rows: List[ChannelFeatures]) -> List[float]:
-    # components
-    subs   = [log10p1(r.subscribers) for r in rows]
-    views  = [log10p1(r.views_total) for r in rows]
-    vids   = [log10p1(r.video_count) for r in rows]
-    freq   = [min(1.0, r.uploads_90d / 13.0) for r in rows]   # ≈ uploads/week
-    recency= [math.exp(-r.days_since_last / 45.0) for r in rows]
-
-    nsubs  = minmax_norm(subs)
-    nviews = minmax_norm(views)
-    nvids  = minmax_norm(vids)
-    nfreq  = minmax_norm(freq)
-    nrec   = minmax_norm(recency)
-
-    scores = []
-    for i in range(len(rows)):
-        s = 0.25 * nsubs[i] + 0.25 * nviews[i] + 0.10 * nvids[i] + 0.20 * nfreq[i] + 0.20 * nrec[i]
-        scores.append(s)
-    return scores
+    if not rows: return []
+    X = np.array([(r.subscribers, r.views_total, r.video_count, r.uploads_90d, r.days_since_last) for r in rows],
+                 dtype=np.float64)
+    # components: log subs/views/videos, upload frequency (≈ uploads/week), recency decay
+    feat = np.empty_like(X)
+    feat[:, 0:3] = np.log10(np.maximum(1.0, X[:, 0:3]))
+    feat[:, 3] = np.minimum(1.0, X[:, 3] / 13.0)
+    feat[:, 4] = np.exp(-X[:, 4] / 45.0)
+
+    # per-column min-max normalisation; constant columns score 0
+    mn, mx = feat.min(axis=0), feat.max(axis=0)
+    spread = mx > mn
+    norm = np.where(spread, (feat - mn) / np.where(spread, mx - mn, 1.0), 0.0)
+    return (norm @ SCORE_WEIGHTS).tolist()
 
 # ------------- Main -------------
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--out", default="public/top500_ranked.csv")
-    ap.add_argument("--max_new", type=int, default=1500)
+    ap.add_argument("--max_new", type=int, default=1500, help="cap on discovered (non-seed) channels to evaluate")
     ap.add_argument("--discover", choices=["true","false"], default="true")
+    ap.add_argument("--workers", type=int, default=MAX_WORKERS)
+    ap.add_argument("--no_cache", action="store_true", help="bypass the on-disk API response cache and ignore stored features")
+    ap.add_argument("--refresh_older_than", type=float, default=None, metavar="HOURS",
+                    help="re-fetch cached responses older than this (overrides per-endpoint TTLs)")
+    ap.add_argument("--refresh_ttl_hours", type=float, default=24,
+                    help="reuse a channel's features from a previous run if younger than this (0 = always refresh)")
     args = ap.parse_args()
 
+    global _cache
+    if not args.no_cache:
+        _cache = ResponseCache(CACHE_DIR, CACHE_TTL_HOURS, args.refresh_older_than)
+        _cache.prune(CACHE_MAX_AGE_DAYS * 24)
+
     y = yt_client()
-    seed_ids = set(load_lines(SEED_IDS_PATH))
-    blocked  = set(load_lines(BLOCKED_IDS_PATH))
+    seed_list = load_lines(SEED_IDS_PATH)   # file order; iterating the frozenset would reorder per run
+    seed_ids = frozenset(seed_list)
+    blocked  = frozenset(load_lines(BLOCKED_IDS_PATH))
 
     # ----- discovery -----
-    candidate_ids: List[str] = []
+    # ordered set: seeds first (always included), then discovery hits, deduped as they arrive
+    candidates: Dict[str, None] = dict.fromkeys(seed_list)
     if args.discover == "true":
-        for qi, q in enumerate(DISCOVERY_QUERIES[:MAX_DISCOVER_QUERIES], 1):
-            ids = search_channels(y, q, MAX_DISCOVER_CHANNELS_PER_QUERY)
-            candidate_ids += ids
-            time.sleep(0.2)
-        # also pull from related channels of the seeds (light)
-        if seed_ids:
-            seed_ch_objs = list_channels(y, list(seed_ids))
-            for ch in seed_ch_objs:
-                # brandingSettings.channel.keywords sometimes contains related hints
-                kws = (safe_get(ch, ["brandingSettings","channel","keywords"], "") or "")
-                # pick potential channel ids embedded — this is best-effort; usually empty
-                # (we won't rely on this; discovery queries do the heavy lifting)
-            time.sleep(0.2)
-
-    # always include seeds
-    candidate_ids = list(dict.fromkeys(list(seed_ids) + candidate_ids))
-    if args.max_new and len(candidate_ids) > args.max_new:
-        candidate_ids = candidate_ids[:args.max_new]
+        # queries are independent: run them concurrently, merge in query order
+        queries = DISCOVERY_QUERIES[:MAX_DISCOVER_QUERIES]
+        with ThreadPoolExecutor(max_workers=max(1, min(args.workers, len(queries)))) as ex:
+            discover_channels(ex, queries, MAX_DISCOVER_CHANNELS_PER_QUERY, candidates)
+
+    # drop blocked channels before any per-channel quota is spent on them;
+    # --max_new caps discovery hits only, seeds are never truncated away
+    seed_part = [cid for cid in candidates if cid in seed_ids and cid not in blocked]
+    disc_part = [cid for cid in candidates if cid not in seed_ids and cid not in blocked]
+    if args.max_new:
+        disc_part = disc_part[:args.max_new]
+    candidate_ids = seed_part + disc_part
+
+    # ----- Incremental: reuse recent per-channel features -----
+    store = {} if args.no_cache else load_feature_store(FEATURES_STORE_PATH)
+    reused = fresh_features(store, args.refresh_ttl_hours)
+    to_fetch = [cid for cid in candidate_ids if cid not in reused]
+    if reused:
+        print(f"[KE500] reusing features for {len(candidate_ids) - len(to_fetch)} channel(s) fresher than {args.refresh_ttl_hours:g}h")
 
     # ----- Fetch channel objects & features -----
-    ch_objs = list_channels(y, candidate_ids) if candidate_ids else []
-    # merge-in seeds that might not appear in discovery (ensure all seeds processed)
-    extra_seed_objs = []
-    if seed_ids:
-        already = {c.get("id") for c in ch_objs}
-        missing = [cid for cid in seed_ids if cid not in already]
-        if missing:
-            extra_seed_objs = list_channels(y, missing)
-    ch_objs = ch_objs + extra_seed_objs
-
-    # Deduplicate by channel id
-    uniq = {}
-    for ch in ch_objs:
-        cid = ch.get("id")
-        if cid and cid not in uniq:
-            uniq[cid] = ch
-    ch_objs = list(uniq.values())
-
-    # Filter by Kenya + thresholds and compute features
+    # Filter by Kenya + thresholds while the pipeline pulls the publish times of
+    # ~30 recent uploads per channel (for 90d uploads + recency).
+    computed: Dict[str, ChannelFeatures] = {}
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as ex:
+        ch_objs, uploads = fetch_channel_pipeline(ex, to_fetch, 30, seed_ids)
+
+    now = datetime.now(timezone.utc)   # one clock read shared by every channel's recency
+    for cid, ch in ch_objs.items():
+        published = uploads.get(cid)
+        if published:
+            feat = extract_features(ch, published, now)
+            computed[feat.cid] = feat
+
+    # Stitch reused + freshly computed rows back together in candidate order
     features: List[ChannelFeatures] = []
-    for ch in ch_objs:
-        cid = ch.get("id") or ""
-        if not cid or cid in blocked: 
-            continue
-        feat = extract_features(y, ch)
-        if feat:
-            features.append(feat)
+    for cid in candidate_ids:
+        feat = computed.get(cid) or reused.get(cid)
+        if feat: features.append(feat)
+
+    now_ts = now.timestamp()
+    save_feature_store(FEATURES_STORE_PATH, {
+        **{cid: store[cid] for cid in candidate_ids if cid in reused},
+        **{cid: {"fetched_at": now_ts, "features": {k: getattr(f, k) for k in f.__slots__}} for cid, f in computed.items()},
+    })
 
     if not features:
         # fallback: just write seeds minimally with rank by subs
-        seed_objs = list_channels(y, list(seed_ids)) if seed_ids else []
+        seed_objs = list_channels(y, seed_list) if seed_list else []
         for ch in seed_objs:
             cid = ch.get("id") or ""
             if not cid or cid in blocked: continue
@@ -392,17 +704,14 @@ def main():
 
     # Score + rank
     scores = compute_scores(features)
-    ranked = list(zip(features, scores))
-    ranked.sort(key=lambda t: t[1], reverse=True)
-    ranked = ranked[:500]
+    ranked = heapq.nlargest(500, zip(features, scores), key=lambda t: t[1])
 
     # Write CSV (rank + id + name)
     os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
     with open(args.out, "w", newline="", encoding="utf-8") as f:
         w = csv.writer(f)
         w.writerow(["rank","channel_id","channel_name"])
-        for i, (feat, _) in enumerate(ranked, 1):
-            w.writerow([i, feat.cid, feat.name])
+        w.writerows((i, feat.cid, feat.name) for i, (feat, _) in enumerate(ranked, 1))
 
     print(f"[KE500] wrote {args.out} with {len(ranked)} channels")
 
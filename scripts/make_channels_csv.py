@@ -6,10 +6,13 @@ ap.add_argument("--ranked", default="top500_ranked.csv")
 ap.add_argument("--out", default="channels.csv")
 args = ap.parse_args()
 
-df = pd.read_csv(args.ranked)
-for c in ["rank","channel_id","channel_name"]:
+COLS = ["rank","channel_id","channel_name"]
+
+# the ranked CSV carries ~16 columns; only parse the three we emit, as text
+df = pd.read_csv(args.ranked, usecols=lambda c: c in COLS, dtype=str)
+for c in COLS:
     if c not in df.columns: df[c] = ""
 
-out = df.head(500)[["rank","channel_id","channel_name"]]
+out = df.head(500)[COLS]
 out.to_csv(args.out, index=False)
 print("Wrote", args.out, len(out))